@@ -1,11 +1,14 @@
 """Create a major version alias for a semantic version release."""
 
 import argparse
+import bisect
 import logging
 import re
 import subprocess
 import sys
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import semver
@@ -16,9 +19,16 @@ from .utils import (
     tag_to_semver,
     get_github_releases_from_checkout,
     Release,
+    subprocess_env,
 )
 
 
+_LOGGER = logging.getLogger(__name__)
+
+# Regex to match fully-qualified tag refs (e.g. `refs/tags/v1.2.3`)
+_REF_TAGS_RE = re.compile(r"^refs/tags/([^/]+)$")
+
+
 class IneligibleAliasError(Exception):
     """
     Exception to indicate that the major alias shouldn't be updated.
@@ -49,45 +59,66 @@ class ReleaseAliaser(LoggingMixin):
         # dereferenced
         self.tag_to_commit_map: dict[str, str] = {}
 
+        # Inverse of the above: map between commit hashes and all of their tags
+        self.commit_to_tags_map: defaultdict[str, list[str]] = defaultdict(list)
+
         # Tags associated with a release on GitHub
         self.tag_to_release_map: dict[str, Release] = {}
 
         # Map between existing tags and semantic versions
         self.tag_to_version_map: dict[str, semver.version.Version] = {}
 
-        # Fill in all data
-        for tag, commit in dereference_tags(self.repo_dir).items():
+        # Map between major versions and their non-prerelease semantic
+        # version tags (the only candidates for aliases), sorted by version
+        self.major_to_tags_map: defaultdict[int, list[str]] = defaultdict(list)
+
+        # Fill in all data. Both queries are dominated by subprocess and
+        # network latency, so run them concurrently.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            tags_future = executor.submit(dereference_tags, self.repo_dir)
+            releases_future = executor.submit(
+                get_github_releases_from_checkout, self.repo_dir
+            )
+
+            git_tags = tags_future.result()
+            github_releases = releases_future.result()
+
+        for tag, commit in git_tags.items():
             self._add_git_tag(tag, commit)
 
-        for release in get_github_releases_from_checkout(self.repo_dir):
+        for release in github_releases:
             self._add_github_release(release)
 
     def assert_invariants(self):
         """Confirm that the collected data is in a reasonable state."""
-        release_keys = self.tag_to_release_map.keys()
-        commit_keys = self.tag_to_commit_map.keys()
-        version_keys = self.tag_to_version_map.keys()
-
         # All releases must have corresponding git tags
-        if unknown_tags := release_keys - commit_keys:
+        if unknown_tags := [
+            tag for tag in self.tag_to_release_map if tag not in self.tag_to_commit_map
+        ]:
             raise AliasError(
                 f"GitHub reports tags that are not visible locally: {unknown_tags}"
             )
 
         # All semantic version tags must also be git tags
-        if unknown_tags := version_keys - commit_keys:
+        if unknown_tags := [
+            tag for tag in self.tag_to_version_map if tag not in self.tag_to_commit_map
+        ]:
             raise AliasError(
                 f"Invalid data state - non-git version tags exist: {unknown_tags}"
             )
 
         # Issue warnings about SemVer tags not associated with a release
-        for tag in sorted(version_keys - release_keys):
+        for tag in sorted(
+            tag for tag in self.tag_to_version_map if tag not in self.tag_to_release_map
+        ):
             self.logger.warning(
                 "SemVer tag `%s` does not have a matching GitHub Release.", tag
             )
 
         # Issue warnings about releases not associated with SemVer tags
-        for tag in sorted(release_keys - version_keys):
+        for tag in sorted(
+            tag for tag in self.tag_to_release_map if tag not in self.tag_to_version_map
+        ):
             release = self.tag_to_release_map[tag]
             self.logger.warning(
                 "Github Release `%s` uses the non-SemVer tag `%s`. "
@@ -99,12 +130,30 @@ class ReleaseAliaser(LoggingMixin):
     def _add_git_tag(self, tag: str, commit: str):
         """Shim method to make it easier to test."""
         self.logger.debug("Registering git tag `%s` at commit `%s`", tag, commit)
+        prior_commit = self.tag_to_commit_map.get(tag)
         self.tag_to_commit_map[tag] = commit
+        self.commit_to_tags_map[commit].append(tag)
+
+        if prior_commit is not None:
+            # The tag moved. The version indexes below only depend on the tag
+            # name, so they are already up-to-date.
+            self.commit_to_tags_map[prior_commit].remove(tag)
+            return
 
         try:
-            self.tag_to_version_map[tag] = tag_to_semver(tag)
+            version = tag_to_semver(tag)
         except ValueError as err:
             self.logger.info(err)
+            return
+
+        self.tag_to_version_map[tag] = version
+
+        if not version.prerelease:
+            bisect.insort(
+                self.major_to_tags_map[version.major],
+                tag,
+                key=self.tag_to_version_map.__getitem__,
+            )
 
     def _add_github_release(self, release: Release):
         """Shim method to make it easier to test."""
@@ -121,38 +170,25 @@ class ReleaseAliaser(LoggingMixin):
 
         target_alias = f"v{major_version}"
 
-        # Find all semantic version tags that are associated with GitHub releases
-        eligible_tags = []
-
-        for tag in self.tag_to_commit_map:
-            # Ignore non-semantic-version tags
-            if not (version := self.tag_to_version_map.get(tag)):
-                continue
-
+        # Find the highest semantic version tag of this major version that is
+        # associated with a non-prerelease, non-draft GitHub release
+        for tag in reversed(self.major_to_tags_map.get(major_version, ())):
             # Ignore non-GitHub-Release tags
             if not (release := self.tag_to_release_map.get(tag)):
                 continue
 
-            # Ignore prereleases (either SemVer or GitHub), drafts, and
-            # different major releases
-            if (
-                release.isDraft
-                or release.isPrerelease
-                or version.prerelease
-                or version.major != major_version
-            ):
+            # Ignore GitHub prereleases and drafts (SemVer prereleases are
+            # never added to the map)
+            if release.isDraft or release.isPrerelease:
                 continue
 
-            eligible_tags.append(tag)
-
-        eligible_tags.sort(key=lambda x: self.tag_to_version_map[x])
-
-        if not eligible_tags:
+            target_tag = tag
+            break
+        else:
             raise IneligibleAliasError(
-                "No eligible release tags for alias `{target_alias}`"
+                f"No eligible release tags for alias `{target_alias}`"
             )
 
-        target_tag = eligible_tags[-1]
         self.logger.info("Alias `%s` should point to `%s`", target_alias, target_tag)
 
         return (target_alias, target_tag)
@@ -163,8 +199,8 @@ class ReleaseAliaser(LoggingMixin):
         if aliased_commit := self.tag_to_commit_map.get(target_alias):
             other_tags = [
                 tag
-                for tag, commit in self.tag_to_commit_map.items()
-                if commit == aliased_commit and tag != target_alias
+                for tag in self.commit_to_tags_map.get(aliased_commit, ())
+                if tag != target_alias
             ]
 
             if target_tag in other_tags:
@@ -181,7 +217,7 @@ class ReleaseAliaser(LoggingMixin):
                     aliased_commit,
                 )
             else:
-                self.logger.info(
+                self.logger.log(
                     NOTICE,
                     "Alias `%s` currently points to untagged commit: %s",
                     target_alias,
@@ -204,13 +240,18 @@ class ReleaseAliaser(LoggingMixin):
                 target_tag,
             ],
             cwd=self.repo_dir,
+            env=subprocess_env(),
+            stdin=subprocess.DEVNULL,
             check=True,
         )
 
-        # Push the tag to GitHub
+        # Push the tag to GitHub. Use the full refname so that git doesn't need
+        # to disambiguate the alias against branches.
         subprocess.run(
-            ["git", "push", "--force", "origin", target_alias],
+            ["git", "push", "--force", "origin", f"refs/tags/{target_alias}"],
             cwd=self.repo_dir,
+            env=subprocess_env(),
+            stdin=subprocess.DEVNULL,
             check=True,
         )
 
@@ -233,8 +274,8 @@ def entrypoint():
 
     args = parser.parse_args()
 
-    if not (tag_re := re.match(r"^refs/tags/([^/]+)$", args.changed_ref)):
-        logging.getLogger(__name__).log(
+    if not (tag_re := _REF_TAGS_RE.match(args.changed_ref)):
+        _LOGGER.log(
             NOTICE,
             "Ref `%s` is not a tag - this workflow should not have been called",
             args.changed_ref,
@@ -244,7 +285,7 @@ def entrypoint():
     try:
         changed_version = tag_to_semver(tag_re.group(1))
     except ValueError:
-        logging.getLogger(__name__).log(
+        _LOGGER.log(
             NOTICE,
             "Tag `%s` is not a semantic version - not updating any aliases",
             tag_re.group(1),
@@ -252,9 +293,7 @@ def entrypoint():
         sys.exit(0)
 
     if changed_version.major < 1:
-        logging.getLogger(__name__).log(
-            NOTICE, "This workflow only updates `v1` and above"
-        )
+        _LOGGER.log(NOTICE, "This workflow only updates `v1` and above")
         sys.exit(0)
 
     aliaser = ReleaseAliaser(args.repo_dir)
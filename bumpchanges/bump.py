@@ -7,12 +7,13 @@ import os
 import tempfile
 import zoneinfo
 
-from logging import getLogger
 from pathlib import Path
 
 from .changelog import Changelog, ChangelogError
 from .logging import setup_logging, NOTICE
 
+_LOGGER = logging.getLogger(__name__)
+
 
 def update_changelog(
     changelog_file: Path, repo_url: str, version: str, date: datetime.date
@@ -22,7 +23,7 @@ def update_changelog(
     try:
         changelog = Changelog(changelog_file, repo_url)
     except ChangelogError:
-        getLogger(__name__).exception("Could not parse changelog")
+        _LOGGER.exception("Could not parse changelog")
         raise
 
     changelog.update_version(version, date)
@@ -40,7 +41,6 @@ def write_commit_details(version: str):
     bump_type = os.environ["BUMP_TYPE"]
     exact_version = os.environ["EXACT_VERSION"]
 
-    body_values = {}
     body_values = {"Actor": f"@{actor}"}
 
     if trigger_actor != actor:
@@ -67,11 +67,9 @@ Merging this PR will trigger another workflow to create the release tag **v{vers
 | Input | Value |
 | ----- | ----- |
 """
+            + "".join(f"| {key} | {value} |\n" for key, value in body_values.items())
         )
 
-        for key, value in body_values.items():
-            bodyfile.write(f"| {key} | {value} |\n")
-
         outputs["pr_bodyfile"] = bodyfile.name
 
     outputs["pr_title"] = f"Prepare for version `{version}`"
@@ -98,14 +96,12 @@ def entrypoint():
         try:
             tzinfo = zoneinfo.ZoneInfo(input_timezone)
         except zoneinfo.ZoneInfoNotFoundError:
-            logging.getLogger(__name__).warning(
+            _LOGGER.warning(
                 "Time zone `%s` not found! Defaulting to UTC", input_timezone
             )
             tzinfo = datetime.timezone.utc
     except KeyError:
-        logging.getLogger(__name__).log(
-            NOTICE, "No time zone provided, defaulting to UTC"
-        )
+        _LOGGER.log(NOTICE, "No time zone provided, defaulting to UTC")
         tzinfo = datetime.timezone.utc
 
     now_date = datetime.datetime.now(tzinfo).date()
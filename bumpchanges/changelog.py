@@ -1,21 +1,26 @@
 """Classes to handle parsing and updating CHANGELOG.md files."""
 
 import datetime
+import functools
 import itertools
 import logging
+import operator
 import re
 
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import ClassVar, Optional
 
-import mdformat
+from mdformat.renderer import MDRenderer
 from markdown_it import MarkdownIt
 from markdown_it.token import Token
 
 from .logging import NOTICE
 from .utils import version_to_tag_str
 
+_LOGGER = logging.getLogger(__name__)
+
 
 class ChangelogError(Exception):
     """Indicate a fundamental problem with the CHANGELOG structure."""
@@ -25,7 +30,7 @@ class EmptyListError(Exception):
     """Indicate that a section is empty and should be stripped."""
 
 
-def parse_heading(tokens: list[Token]) -> tuple[str, Token]:
+def parse_heading(tokens: deque[Token]) -> tuple[str, Token]:
     """Parse the `inline` element from the heading."""
     if (
         len(tokens) < 3
@@ -34,14 +39,14 @@ def parse_heading(tokens: list[Token]) -> tuple[str, Token]:
     ):
         raise ChangelogError(f"Invalid header section (line {tokens[0].map})")
 
-    tag = tokens.pop(0).tag
-    inline = tokens.pop(0)
-    tokens.pop(0)
+    tag = tokens.popleft().tag
+    inline = tokens.popleft()
+    tokens.popleft()
 
     return (tag, inline)
 
 
-def parse_bullet_list(tokens: list[Token]) -> list[Token]:
+def parse_bullet_list(tokens: deque[Token]) -> list[Token]:
     """Consume tokens and return all of the child list_items."""
     # Parse the heading
     if not tokens or tokens[0].type != "bullet_list_open":
@@ -51,7 +56,7 @@ def parse_bullet_list(tokens: list[Token]) -> list[Token]:
     list_tokens = []
 
     while tokens:
-        list_tokens.append(tokens.pop(0))
+        list_tokens.append(tokens.popleft())
         nesting += list_tokens[-1].nesting
 
         if nesting == 0:
@@ -81,6 +86,47 @@ def heading(level: int, children: list):
     ]
 
 
+# Regex to match versions, with or without embedded links and dates. Linked
+# versions are tried first and captured as `link_version_str`.
+# Will match:
+#   [v1.2.3](https://foo.bar) - 2020-01-01
+#   [1.2.3](https://foo.bar) - 2020-01-01
+#   [1.2.3](https://foo.bar)
+#   [badversion](https://foo.bar)
+#   [1.2.3] - 2020-01-01
+#   [badversion]
+#   1.2.3 - 2020-01-01
+#   1.2.3
+#   badversion
+_HEADING_RE = re.compile(
+    r"^(?:\[(?P<link_version_str>.+?)\]\((?:.+?)\)|\[?(?P<version_str>.+?)\]?)"
+    r"(?:\s+-\s+(?P<date>.*))?$"
+)
+
+# Regex to match versions with leading `v`s (for removal)
+_LEADING_V_RE = re.compile(r"^[vV]\d")
+
+# Regex to match mis-leveled headings. The `version` group matches
+# version-like headers that should be H2s, and the `section` group matches
+# category-like headers that should be H3s.
+# Will match:
+#   [v1...
+#   [1....
+#   Added / fixed / Changes / remove...
+# Will not match:
+#   [ver...
+_WRONG_HEADING_RE = re.compile(
+    r"^(?:(?P<version>\[v?\d)|(?P<section>(?i:add|fix|change|remove)))"
+)
+
+# Regex to strip stray brackets and trailing colons from section headings
+_HEADING_STRIP_RE = re.compile(r"^\[?(.*?)\]?:?$")
+
+# Shared markdown parser. Parsing does not modify the parser, so there is no
+# need to rebuild its rule chains for every Changelog.
+_MARKDOWN_PARSER = MarkdownIt("gfm-like")
+
+
 HEADING_REPLACEMENTS = {
     "updated": "changed",
     "change": "changed",
@@ -89,45 +135,26 @@ HEADING_REPLACEMENTS = {
 }
 
 
-@dataclass
+@functools.lru_cache(maxsize=256)
+def _normalize_heading_name(heading_name: str) -> str:
+    """Return the ChangelogVersion section name for a raw H3 heading."""
+    # Strip off any stray brackets and trailing colons
+    heading_name = _HEADING_STRIP_RE.sub(r"\1", heading_name).lower()
+    return HEADING_REPLACEMENTS.get(heading_name, heading_name)
+
+
+# Serialization order of the ChangelogVersion sections, with precomputed
+# attribute getters
+_SECTION_GETTERS = tuple(
+    (section, operator.attrgetter(section))
+    for section in ("added", "changed", "deprecated", "removed", "fixed", "security")
+)
+
+
+@dataclass(slots=True)
 class ChangelogVersion:
     """Class to help manage individual releases within CHANGELOG.md files."""
 
-    # Regex to match versions with embedded links, with or without dates
-    # Will match:
-    #   [v1.2.3](https://foo.bar) - 2020-01-01
-    #   [1.2.3](https://foo.bar) - 2020-01-01
-    #   [1.2.3](https://foo.bar)
-    #   [badversion](https://foo.bar)
-    link_heading_re: ClassVar = re.compile(
-        r"^\[(?P<version_str>.+?)\]\((?:.+?)\)(?:\s+-\s+(?P<date>.*))?$"
-    )
-
-    # Regex to match versions, with or without dates
-    # Will match:
-    #   [1.2.3] - 2020-01-01
-    #   [badversion]
-    #   1.2.3 - 2020-01-01
-    #   1.2.3
-    #   badversion
-    heading_re: ClassVar = re.compile(
-        r"^\[?(?P<version_str>.+?)\]?(?:\s+-\s+(?P<date>.*))?$"
-    )
-
-    # Regex to match versions with leading `v`s (for removal)
-    leading_v_re: ClassVar = re.compile(r"^[vV]\d")
-
-    # Regex to match H1 version-like headers that should be H2s
-    # Will match:
-    #   [v1...
-    #   [1....
-    # Will not match:
-    #   [ver...
-    wrong_h1_re: ClassVar = re.compile(r"^\[v?\d")
-
-    # Regex to match H2 category-like headers taht should be H3s
-    wrong_h2_re: ClassVar = re.compile(r"Add|Fix|Change|Remove", flags=re.IGNORECASE)
-
     UNRELEASED_VERSION: ClassVar = "Unreleased"
 
     version_str: str
@@ -166,24 +193,21 @@ class ChangelogVersion:
         ):
             raise ChangelogError("Invalid version section")
 
-        kwargs = {}
-
-        for regex in (cls.link_heading_re, cls.heading_re):
-            match = regex.match(tokens[1].content)
-            if match:
-                kwargs.update(match.groupdict())
-                break
-        else:
+        match = _HEADING_RE.match(tokens[1].content)
+        if not match:
             raise ChangelogError(f"Invalid section heading: {tokens[1].content}")
 
-        logging.getLogger(__name__).info(
-            "Parsed version: %s", kwargs.get("version_str")
-        )
+        kwargs = {
+            "version_str": match["link_version_str"] or match["version_str"],
+            "date": match["date"],
+        }
+
+        _LOGGER.info("Parsed version: %s", kwargs.get("version_str"))
 
         # Strip any leading `v`s from versions, as long as they are followed by
         # a digit
-        if cls.leading_v_re.match(kwargs["version_str"]):
-            logging.getLogger(__name__).warning(
+        if _LEADING_V_RE.match(kwargs["version_str"]):
+            _LOGGER.warning(
                 "Stripping leading `v` from Changelog version `%s`",
                 kwargs["version_str"],
             )
@@ -194,25 +218,25 @@ class ChangelogVersion:
             kwargs["version_str"] != cls.UNRELEASED_VERSION
             and kwargs["version_str"].lower() == cls.UNRELEASED_VERSION.lower()
         ):
-            logging.getLogger(__name__).warning(
+            _LOGGER.warning(
                 "Case-correcting Changelog version `%s`",
                 kwargs["version_str"],
             )
             kwargs["version_str"] = cls.UNRELEASED_VERSION
 
-        # The rest of the tokens should be the lists. Strip any rulers now.
-        tokens = [token for token in tokens[3:] if token.type != "hr"]
+        # The rest of the tokens should be the lists. Strip any rulers now
+        # (without copying the input first). Use a deque so that consuming
+        # tokens from the front is O(1).
+        tokens = deque(
+            token for token in itertools.islice(tokens, 3, None) if token.type != "hr"
+        )
 
         while tokens:
             if tokens[0].type == "heading_open":
                 _, inline_heading = parse_heading(tokens)
 
                 # For these headings, all we care about is the raw content
-                heading_name = inline_heading.content
-
-                # Strip off any stray brackets and trailing colons
-                heading_name = re.sub(r"^\[?(.*?)\]?:?$", r"\1", heading_name).lower()
-                heading_name = HEADING_REPLACEMENTS.get(heading_name, heading_name)
+                heading_name = _normalize_heading_name(inline_heading.content)
 
                 try:
                     items = parse_bullet_list(tokens)
@@ -227,7 +251,7 @@ class ChangelogVersion:
                 nesting = 0
                 notice = []
                 while tokens:
-                    notice.append(tokens.pop(0))
+                    notice.append(tokens.popleft())
                     nesting += notice[-1].nesting
 
                     if nesting == 0:
@@ -251,8 +275,8 @@ class ChangelogVersion:
 
         return cls(**kwargs)
 
-    def serialize(self):
-        """Yield a stream of markdown tokens describing this ChangelogVersion."""
+    def serialize(self) -> list[Token]:
+        """Return a list of markdown tokens describing this ChangelogVersion."""
 
         link_kwargs = {}
         if self.link:
@@ -271,46 +295,45 @@ class ChangelogVersion:
                 Token("text", tag="", nesting=0, content=f" - {self.date}")
             )
 
-        yield from heading(2, heading_children)
+        tokens = heading(2, heading_children)
 
         for notice in self.notices:
-            yield from notice
-
-        section_order = (
-            "added",
-            "changed",
-            "deprecated",
-            "removed",
-            "fixed",
-            "security",
-        )
+            tokens.extend(notice)
 
-        for section in section_order:
-            section_items = getattr(self, section)
+        for section, getter in _SECTION_GETTERS:
+            section_items = getter(self)
 
             if section_items:
-                yield from heading(
-                    3, [Token("text", tag="", nesting=0, content=section.title())]
+                tokens.extend(
+                    heading(
+                        3, [Token("text", tag="", nesting=0, content=section.title())]
+                    )
                 )
 
-                yield Token(
-                    "bullet_list_open",
-                    tag="ul",
-                    markup="-",
-                    nesting=1,
-                    block=True,
-                    hidden=True,
+                tokens.append(
+                    Token(
+                        "bullet_list_open",
+                        tag="ul",
+                        markup="-",
+                        nesting=1,
+                        block=True,
+                        hidden=True,
+                    )
                 )
-                yield from section_items
-                yield Token(
-                    "bullet_list_close",
-                    tag="ul",
-                    markup="-",
-                    nesting=-1,
-                    block=True,
-                    hidden=True,
+                tokens.extend(section_items)
+                tokens.append(
+                    Token(
+                        "bullet_list_close",
+                        tag="ul",
+                        markup="-",
+                        nesting=-1,
+                        block=True,
+                        hidden=True,
+                    )
                 )
 
+        return tokens
+
 
 class Changelog:
     """Class to help manage CHANGELOG.md files."""
@@ -319,61 +342,56 @@ class Changelog:
         self.changelog_file = changelog_file
         self.repo_url = repo_url
 
-        logger = logging.getLogger(__name__)
+        # Start index of each group of tokens. The first group is the header,
+        # and each following group is one ChangelogVersion.
+        group_starts = [0]
 
-        groups = [[]]
+        all_tokens = _MARKDOWN_PARSER.parse(changelog_file.read_text(encoding="utf-8"))
 
-        all_tokens = MarkdownIt("gfm-like").parse(
-            changelog_file.read_text(encoding="utf-8")
-        )
+        for index, token in enumerate(all_tokens):
+            if token.type == "heading_open" and token.tag in ("h1", "h2"):
+                # Only top-level headings need to look ahead at their content
+                if index + 1 >= len(all_tokens):
+                    raise ChangelogError()
 
-        for token, nexttoken in itertools.pairwise(
-            itertools.chain(
-                all_tokens,
-                [
-                    None,
-                ],
-            )
-        ):
-            # This check is mostly to make pyright happy
-            if token is None:
-                raise RuntimeError("This should never happen")
-
-            if token.type == "heading_open":
-                if token.tag == "h1":
-                    # Several of our repositories have errors where versions
-                    # are mistakenly H1s rather than H2s. Catch those cases and
-                    # fix them up.
-                    if nexttoken is None:
-                        raise ChangelogError()
-
-                    if ChangelogVersion.wrong_h1_re.match(nexttoken.content):
-                        token.tag = "h2"
-                        logger.log(
-                            NOTICE, "Changing `%s` from h1 to h2", nexttoken.content
-                        )
+                nexttoken = all_tokens[index + 1]
+
+                # Classify the heading content once for both checks below
+                wrong_match = _WRONG_HEADING_RE.match(nexttoken.content)
+                wrong_level = wrong_match.lastgroup if wrong_match else None
+
+                # Several of our repositories have errors where versions are
+                # mistakenly H1s rather than H2s. Catch those cases and fix them
+                # up.
+                if token.tag == "h1" and wrong_level == "version":
+                    token.tag = "h2"
+                    _LOGGER.log(
+                        NOTICE, "Changing `%s` from h1 to h2", nexttoken.content
+                    )
 
                 if token.tag == "h2":
                     # A lot of our repositories have an issue where "Added",
                     # "Fixed", etc. are mistakenly H2s rather than H3s. Catch those
                     # cases and fix them up.
-                    if nexttoken is None:
-                        raise ChangelogError()
-
-                    if ChangelogVersion.wrong_h2_re.match(nexttoken.content):
+                    if wrong_level == "section":
                         token.tag = "h3"
-                        logger.log(
+                        _LOGGER.log(
                             NOTICE, "Changing `%s` from h2 to h3", nexttoken.content
                         )
                     else:
                         # Split split these tokens off into a new ChangelogVersion
-                        groups.append([])
+                        group_starts.append(index)
 
-            groups[-1].append(token)
+        group_ends = [*group_starts[1:], len(all_tokens)]
 
-        self.header = [token for token in groups.pop(0) if token.tag != "hr"]
+        self.header = [
+            token for token in all_tokens[: group_ends[0]] if token.tag != "hr"
+        ]
 
-        self.versions = [ChangelogVersion.from_tokens(group) for group in groups]
+        self.versions = [
+            ChangelogVersion.from_tokens(all_tokens[start:end])
+            for start, end in zip(group_starts[1:], group_ends[1:])
+        ]
 
         if not self.versions:
             raise ChangelogError("No versions!")
@@ -384,7 +402,7 @@ class Changelog:
             not self.versions
             or self.versions[0].version_str != ChangelogVersion.UNRELEASED_VERSION
         ):
-            logging.getLogger(__name__).warning(
+            _LOGGER.warning(
                 "No %s section - adding a new empty section",
                 ChangelogVersion.UNRELEASED_VERSION,
             )
@@ -397,7 +415,7 @@ class Changelog:
 
     def render(self) -> str:
         """Render the CHANGELOG to markdown."""
-        renderer = mdformat.renderer.MDRenderer()
+        renderer = MDRenderer()
 
         options = {}
 
@@ -5,7 +5,6 @@ import json
 import logging
 import os
 import subprocess
-import textwrap
 
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -21,6 +20,11 @@ from .utils import (
     NoAppropriateTagError,
 )
 
+# Body of the PR comment linking to the new release
+_COMMENT_TEMPLATE = (
+    "A new release has been {action} as {url}. Please review the details for accuracy."
+)
+
 
 class InvalidReleaseError(Exception):
     """Exception indicating that the workflow should not have run."""
@@ -106,17 +110,13 @@ class PreparedRelease(LoggingMixin):
         if self.prerelease:
             args.append("--prerelease")
 
-        release_url = subprocess.check_output(args).decode("utf-8").strip()
+        release_url = subprocess.check_output(args, encoding="utf-8").strip()
         self.logger.log(NOTICE, "Release created at %s", release_url)
 
         # Post a comment linking to the new release
         comment_header = "*Bleep bloop, I am a robot.*"
-        comment_body = textwrap.fill(
-            textwrap.dedent(f"""\
-                A new release has been {"drafted" if draft else "created"}
-                as {release_url}. Please review the details for accuracy.
-                """),
-            width=2000,
+        comment_body = _COMMENT_TEMPLATE.format(
+            action="drafted" if draft else "created", url=release_url
         )
 
         subprocess.run(
@@ -4,36 +4,47 @@ import argparse
 import re
 import os
 
+from collections.abc import Container
 from logging import getLogger
 from pathlib import Path
 
 
 from .logging import setup_logging, NOTICE
 from .utils import (
+    dereference_tags,
     get_closest_semver_ancestor,
     version_to_tag_str,
-    tag_exists,
     str_to_bool,
     encode_branch_name,
 )
 
+# Regex to check that exact versions start with a digit (no leading `v`)
+_LEADING_DIGIT_RE = re.compile(r"^\d")
+
 
 def get_next_semver(repo_dir: Path, bump_type: str, prerelease: bool) -> str:
     """Validate and return the next semantic version."""
     logger = getLogger(__name__)
 
-    last_version = get_closest_semver_ancestor(repo_dir, allow_prerelease=False)
+    # Snapshot all existing tags once rather than probing git per version, and
+    # share the snapshot with the ancestor search
+    tag_to_commit_map = dereference_tags(repo_dir)
+    existing_tags = tag_to_commit_map.keys()
+
+    last_version = get_closest_semver_ancestor(
+        repo_dir, allow_prerelease=False, tag_to_commit_map=tag_to_commit_map
+    )
     next_version = last_version.next_version(part=bump_type)
 
     if prerelease:
         next_version = next_version.bump_prerelease()
         # Look for the next non-existing prerelease version
-        while tag_exists(repo_dir, version_to_tag_str(next_version)):
+        while version_to_tag_str(next_version) in existing_tags:
             logger.debug("Prerelease %s already exists, bumping again...", next_version)
             next_version = next_version.bump_prerelease()
 
     next_version_str = str(next_version)
-    validate_version_bump(repo_dir, str(last_version), next_version_str)
+    validate_version_bump(existing_tags, str(last_version), next_version_str)
     return next_version_str
 
 
@@ -45,18 +56,18 @@ def get_exact_version(repo_dir: Path, exact_version) -> str:
         logger.error("Exact version requested, but no version supplied!")
         raise RuntimeError()
 
-    if not re.match(r"^\d", exact_version):
+    if not _LEADING_DIGIT_RE.match(exact_version):
         logger.error("Input version `{exact_version}` does not start with a digit")
         raise RuntimeError()
 
-    validate_version_bump(repo_dir, "<ignored>", exact_version)
+    validate_version_bump(dereference_tags(repo_dir).keys(), "<ignored>", exact_version)
     return exact_version
 
 
 def validate_version_bump(
-    repo_dir: Path, prior_version_str: str, next_version_str: str
+    existing_tags: Container[str], prior_version_str: str, next_version_str: str
 ):
-    """Validate that the proposed version is acceptable."""
+    """Validate that the proposed version does not collide with existing tags."""
     logger = getLogger(__name__)
 
     logger.info("%s -> %s", prior_version_str, next_version_str)
@@ -64,7 +75,7 @@ def validate_version_bump(
     logger.log(NOTICE, "New version (tag): %s (%s)", next_version_str, next_tag)
 
     # Confirm that the corresponding git tag does not exist
-    if tag_exists(repo_dir, next_tag):
+    if next_tag in existing_tags:
         # Oops, that tag does exist
         logger.error("Tag %s already exists!", next_tag)
         raise RuntimeError()
@@ -83,7 +94,6 @@ def entrypoint():
     parser.add_argument("exact_version", type=str)
 
     args = parser.parse_args()
-    setup_logging()
 
     if args.bump_type == "exact":
         next_version = get_exact_version(args.repo_dir, args.exact_version)
@@ -5,6 +5,9 @@ import logging
 
 NOTICE = 25
 
+# Set once the handlers have been installed by `setup_logging`
+_SETUP_DONE = False
+
 
 class GHAFilter(logging.Filter):
     """A logging filter that plays nice with GitHub Actions output."""
@@ -27,10 +30,14 @@ class GHAFilter(logging.Filter):
 
 def setup_logging():
     """Set up logging to GitHub Actions.logger."""
+    # pylint: disable=global-statement
+    global _SETUP_DONE
+
     # Does this need to be re-entrant like this?
-    if logging.getLevelName("NOTICE") == NOTICE:
+    if _SETUP_DONE:
         return
 
+    _SETUP_DONE = True
     logging.addLevelName(NOTICE, "NOTICE")
 
     handler = logging.StreamHandler()
@@ -39,37 +39,36 @@ VERSION_REGEX = re.compile(
     flags=re.VERBOSE | re.IGNORECASE | re.MULTILINE,
 )
 
+# Folders within the repository that version files may not live under
+_PROTECTED_FOLDERS = frozenset((".git", ".github"))
+
 
 def update_file(version: str, version_file: Path):
     """Update a single file with the new version number."""
     original_text = version_file.read_text(encoding="utf-8")
-    updated_text, update_count = VERSION_REGEX.subn(
-        r"\g<prefix>" + version + r"\g<suffix>", original_text
-    )
-
-    if update_count == 0:
-        raise ValueError(f"Version regex not found in {version_file}!")
+    replacement = r"\g<prefix>" + version + r"\g<suffix>"
 
-    if update_count > 1:
-        # Find the different lines
-        original_lines = original_text.splitlines()
-        updated_lines = updated_text.splitlines()
+    # Match against the whole text, as the value may sit on the line after the
+    # key. Collect the matches first so that multiple versions are reported
+    # even when the replacement leaves them unchanged.
+    matches = list(VERSION_REGEX.finditer(original_text))
 
-        changed_pairs = [
-            (orig, updated)
-            for (orig, updated) in zip(original_lines, updated_lines)
-            if orig != updated
-        ]
+    if not matches:
+        raise ValueError(f"Version regex not found in {version_file}!")
 
-        assert len(changed_pairs) == update_count
+    if len(matches) > 1:
         logging.getLogger(__name__).error(
             "Multiple versions updated in %s", version_file
         )
-        for orig, updated in changed_pairs:
-            logging.getLogger(__name__).debug("`%s` -> `%s`", orig, updated)
+        for match in matches:
+            logging.getLogger(__name__).debug(
+                "`%s` -> `%s`", match[0], match.expand(replacement)
+            )
 
         raise ValueError(f"Multiple versions changed in {version_file}")
 
+    updated_text = VERSION_REGEX.sub(replacement, original_text, count=1)
+
     logging.getLogger(__name__).log(NOTICE, "Version updated in %s", version_file)
     version_file.write_text(updated_text, encoding="utf-8")
 
@@ -78,17 +77,22 @@ def update_files(repo_root: Path, version: str, files_str: str):
     """Update each of the files with the new version number."""
     version_files = [repo_root / item for item in files_str.split(",")]
 
+    # Validate every path before touching any of them, so that a bad entry
+    # late in the list doesn't leave earlier files half-updated
     for version_file in version_files:
         full_version_file = version_file.resolve()
-        logging.getLogger(__name__).info("Trying to update %s", full_version_file)
 
         # Make sure it is a tracked file
-        if not full_version_file.is_relative_to(repo_root):
-            raise ValueError(f"Version file {version_file} is not within the git repo")
+        try:
+            relative_parts = full_version_file.relative_to(repo_root).parts
+        except ValueError as err:
+            raise ValueError(
+                f"Version file {version_file} is not within the git repo"
+            ) from err
 
         # Make sure it's not under the .git folder (probably already covered by
         # the above) or the .github folder
-        if {".git", ".github"} & set(full_version_file.parts):
+        if not _PROTECTED_FOLDERS.isdisjoint(relative_parts):
             raise ValueError(
                 f"Version file {version_file} is within a protected folder"
             )
@@ -97,6 +101,8 @@ def update_files(repo_root: Path, version: str, files_str: str):
         if not full_version_file.is_file():
             raise ValueError(f"Version file {version_file} does not exist")
 
+    for version_file in version_files:
+        logging.getLogger(__name__).info("Trying to update %s", version_file)
         update_file(version, version_file)
 
 
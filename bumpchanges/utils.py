@@ -1,22 +1,25 @@
 """Utility functions."""
 
 import argparse
+import functools
 import logging
 import json
 import operator
+import os
 import re
 import subprocess
-from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import semver
 
 from .logging import NOTICE
 
+_LOGGER = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Release:
     """A representation of a GitHub release."""
 
@@ -31,6 +34,37 @@ class Release:
 
 BRANCH_PREFIX = "automation-create-release-"
 
+# Regex to match the leading `vMAJOR.MINOR.PATCH` of semantic version tags
+_SEMVER_TAG_PREFIX_RE = re.compile(r"v\d+\.\d+\.\d+")
+
+# GraphQL query for one page of releases. The node fields match the `Release`
+# attributes, and `gh api --paginate` drives `$endCursor` from `pageInfo`.
+_RELEASES_QUERY = """
+query($owner: String!, $repo: String!, $endCursor: String) {
+  repository(owner: $owner, name: $repo) {
+    releases(first: 100, after: $endCursor) {
+      nodes { name tagName isDraft isPrerelease }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+# jq filter to emit each release as one line of JSON (names may be null)
+_RELEASES_JQ_FILTER = '.data.repository.releases.nodes[] | .name //= ""'
+
+# Case-insensitive strings accepted by `str_to_bool`
+_TRUTHY_VALUES = frozenset(("true", "t", "yes", "y", "1"))
+_FALSEY_VALUES = frozenset(("false", "f", "no", "n", "0"))
+
+
+def subprocess_env() -> dict[str, str]:
+    """Return the environment for git and gh subprocesses."""
+    # Forcing the C locale lets git skip loading translation catalogs and
+    # keeps any parsed output untranslated. The rest of the environment is
+    # read at call time, as it carries (possibly refreshed) credentials.
+    return {**os.environ, "LC_ALL": "C"}
+
 
 def encode_branch_name(version: str) -> str:
     """Encode this version into a branch name."""
@@ -47,6 +81,7 @@ def decode_branch_name(branch: str) -> str:
     return version
 
 
+@functools.lru_cache(maxsize=4096)
 def tag_to_semver(tag: str) -> semver.version.Version:
     """
     Return the Version associated with this git tag.
@@ -56,6 +91,10 @@ def tag_to_semver(tag: str) -> semver.version.Version:
     if not tag.startswith("v"):
         raise ValueError(f"Tag `{tag}` doesn't start with a `v`")
 
+    # Cheaply reject obviously-invalid tags before the full SemVer parse
+    if not _SEMVER_TAG_PREFIX_RE.match(tag):
+        raise ValueError(f"Tag `{tag}` is not a semantic version")
+
     return semver.Version.parse(tag[1:])
 
 
@@ -67,41 +106,41 @@ def version_to_tag_str(version: Union[str, semver.version.Version]) -> str:
     return f"v{version.lstrip('v')}"
 
 
-def tag_exists(repo_dir: Path, tag: str) -> bool:
-    """Return True if the tag exists, False otherwise."""
-    tag_ref_proc = subprocess.run(
-        ["git", "rev-parse", "--verify", f"refs/tags/{tag}"],
+def dereference_tags(repo_dir: Path) -> dict[str, str]:
+    """Return a dictionary mapping all tags to commit hashes."""
+    # `--dereference` fully peels annotated (and nested annotated) tags, which
+    # `git for-each-ref`'s `%(*objectname)` does not do on all git versions
+    show_ref_proc = subprocess.run(
+        ["git", "show-ref", "--tags", "--dereference"],
         cwd=repo_dir,
-        capture_output=True,
+        env=subprocess_env(),
+        stdout=subprocess.PIPE,
+        encoding="utf-8",
         check=False,
     )
 
-    return tag_ref_proc.returncode == 0
+    # show-ref exits with status 1 if there are no tags at all
+    if show_ref_proc.returncode == 1 and not show_ref_proc.stdout:
+        return {}
 
-
-def dereference_tags(repo_dir: Path) -> dict[str, str]:
-    """Return a dictionary mapping all tags to commit hashes."""
-    show_ref_output = (
-        subprocess.check_output(["git", "show-ref", "--dereference"], cwd=repo_dir)
-        .decode("utf-8")
-        .strip()
-    )
-
-    pattern = re.compile(
-        r"^(?P<commit>\w+)\s+refs/tags/(?P<tag>.*?)(?P<annotated>\^\{\})?$",
-        flags=re.MULTILINE,
-    )
+    show_ref_proc.check_returncode()
 
     tag_to_commit_map: dict[str, str] = {}
     dereferenced_tags: dict[str, str] = {}
 
-    for match in pattern.finditer(show_ref_output):
-        logging.getLogger(__name__).debug(match.groups())
-        operator.setitem(
-            dereferenced_tags if match["annotated"] else tag_to_commit_map,
-            match["tag"],
-            match["commit"],
-        )
+    # Each line is a commit hash and a reference name, with `^{}` appended to
+    # the dereferenced commits of annotated tags
+    for line in show_ref_proc.stdout.splitlines():
+        commit, _, ref = line.partition(" ")
+
+        tag = ref.removeprefix("refs/tags/")
+        if tag == ref:
+            continue
+
+        if (dereferenced_tag := tag.removesuffix("^{}")) != tag:
+            dereferenced_tags[dereferenced_tag] = commit
+        else:
+            tag_to_commit_map[tag] = commit
 
     # Update all of the annotated tags with the dereferenced commits
     tag_to_commit_map.update(dereferenced_tags)
@@ -109,53 +148,58 @@ def dereference_tags(repo_dir: Path) -> dict[str, str]:
     return tag_to_commit_map
 
 
+def _get_github_releases(
+    repo_fields: list[str], cwd: Optional[Path] = None
+) -> list[Release]:
+    """
+    Get all release data for the repository from the GitHub GraphQL API.
+
+    `repo_fields` are the `gh api` field arguments for the `owner` and `repo`
+    query variables. `gh api --paginate` fetches 100 releases per request,
+    and the jq filter emits each release as one line of JSON matching the
+    `Release` fields. Lines are parsed as they arrive on the pipe.
+    """
+    with subprocess.Popen(
+        [
+            "gh",
+            "api",
+            "graphql",
+            "--paginate",
+            "--jq",
+            _RELEASES_JQ_FILTER,
+            "-f",
+            f"query={_RELEASES_QUERY}",
+            *repo_fields,
+        ],
+        cwd=cwd,
+        env=subprocess_env(),
+        stdout=subprocess.PIPE,
+    ) as proc:
+        # This check is mostly to make pyright happy
+        if proc.stdout is None:
+            raise RuntimeError("This should never happen")
+
+        releases = [Release(**json.loads(line)) for line in proc.stdout]
+
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+    return releases
+
+
 def get_github_releases_from_checkout(repo_dir: Path) -> list[Release]:
     """Get all release data from GitHub."""
-    return [
-        Release(**item)
-        for item in json.loads(
-            subprocess.check_output(
-                [
-                    "gh",
-                    "release",
-                    "list",
-                    "--json",
-                    ",".join((
-                        "name",
-                        "tagName",
-                        "isDraft",
-                        "isPrerelease",
-                    )),
-                ],
-                cwd=repo_dir,
-            )
-        )
-    ]
+    # gh fills in the `{owner}` and `{repo}` placeholders of typed (-F) fields
+    # from the checkout
+    return _get_github_releases(
+        ["-F", "owner={owner}", "-F", "repo={repo}"], cwd=repo_dir
+    )
 
 
 def get_github_releases_from_repo_name(owner_repo: str) -> list[Release]:
     """Get all release data from GitHub."""
-    return [
-        Release(**item)
-        for item in json.loads(
-            subprocess.check_output(
-                [
-                    "gh",
-                    "release",
-                    "list",
-                    "--repo",
-                    owner_repo,
-                    "--json",
-                    ",".join((
-                        "name",
-                        "tagName",
-                        "isDraft",
-                        "isPrerelease",
-                    )),
-                ],
-            )
-        )
-    ]
+    owner, _, repo = owner_repo.partition("/")
+    return _get_github_releases(["-f", f"owner={owner}", "-f", f"repo={repo}"])
 
 
 class NoAppropriateTagError(Exception):
@@ -176,137 +220,204 @@ def get_nearest_ancestor_release_tag(owner_repo: str, tag_str: str) -> str:
             f"The input tag `{tag_str}` is not a semantic version"
         ) from err
 
-    logger = logging.getLogger(__name__)
-    logger.debug("Searching for most recent prior release...")
+    _LOGGER.debug("Searching for most recent prior release...")
 
     # Get the prior releases from GitHub
     existing_releases = []
     for release in get_github_releases_from_repo_name(owner_repo):
-        logger.debug("Examining %s...", release.tagName)
+        _LOGGER.debug("Examining %s...", release.tagName)
 
         # Ignore drafts
         if release.isDraft:
-            logger.debug("... draft, ignoring")
+            _LOGGER.debug("... draft, ignoring")
             continue
 
         # Ignore non-semver tags
         try:
             prior_version = tag_to_semver(release.tagName)
-            logger.debug("... matches version %s ...", prior_version)
         except ValueError:
-            logger.debug("... not semver, ignoring")
+            _LOGGER.debug("... not semver, ignoring")
             continue
 
+        _LOGGER.debug("... matches version %s ...", prior_version)
+
         # Ignore higher versions
         if prior_version < semantic_version:
-            logger.debug(
+            _LOGGER.debug(
                 "... %s < %s, keeping for consideration",
                 prior_version,
                 semantic_version,
             )
             existing_releases.append((prior_version, release.tagName))
         else:
-            logger.debug("... %s > %s, ignoring", prior_version, semantic_version)
+            _LOGGER.debug("... %s > %s, ignoring", prior_version, semantic_version)
 
-    existing_releases.sort(key=lambda x: x[0])
-    logger.debug("All prior releases: %s", existing_releases)
+    _LOGGER.debug("All prior releases: %s", existing_releases)
 
-    if existing_releases:
-        logger.debug("The most recent release tag is %s", existing_releases[-1][1])
-        return existing_releases[-1][1]
+    if not existing_releases:
+        raise NoAppropriateTagError("No prior release tags found")
 
-    raise NoAppropriateTagError("No prior release tags found")
+    _, prior_tag = max(existing_releases, key=operator.itemgetter(0))
+    _LOGGER.debug("The most recent release tag is %s", prior_tag)
+    return prior_tag
 
 
-def get_closest_semver_ancestor(
-    repo_dir: Path, allow_prerelease: bool = False
-) -> semver.version.Version:
+def _ancestor_candidates(
+    repo_dir: Path, tag_to_commit_map: dict[str, str], allow_prerelease: bool
+) -> dict[str, tuple[semver.version.Version, str]]:
     """
-    Returns the most recent semantic version ancestor of HEAD.
+    Return the semantic version tags that are ancestors of HEAD.
 
-    If `prerelease` is False, ignore prereleases.
+    The result maps each tag to its (version, commit) pair.
     """
-    # Previously this was using `git describe --tags --abbrev=0 --match
-    # <glob>`, but the differences between the glob and the full regex were
-    # causing issues. Do an exhaustive search instead.
-    all_tags = (
-        subprocess.check_output(["git", "tag"], cwd=repo_dir)
-        .decode("utf-8")
-        .strip()
-        .splitlines()
-    )
-
-    version_distances = defaultdict(list)
+    candidates: dict[str, tuple[semver.version.Version, str]] = {}
 
-    for tag in all_tags:
-        # Ignore the tag if it's not an ancestor of HEAD or a semantic version
+    for tag, commit in tag_to_commit_map.items():
+        # Ignore the tag if it's not a semantic version
         try:
-            subprocess.check_call(
-                ["git", "merge-base", "--is-ancestor", tag, "HEAD"], cwd=repo_dir
-            )
             version = tag_to_semver(tag)
-
-        except subprocess.CalledProcessError:
-            logging.getLogger(__name__).debug(
-                "Tag `%s` is not an ancestor of HEAD", tag
-            )
-            continue
         except ValueError as err:
-            logging.getLogger(__name__).debug(err)
+            _LOGGER.debug(err)
             continue
 
         if version.prerelease and not allow_prerelease:
-            logging.getLogger(__name__).debug("Tag `%s` is a prerelease", tag)
+            _LOGGER.debug("Tag `%s` is a prerelease", tag)
             continue
 
-        # Compute the commit distance between the tag and HEAD
-        distance = int(
+        candidates[tag] = (version, commit)
+
+    # `git rev-list HEAD` fails in an empty repository
+    if not candidates:
+        return candidates
+
+    ancestor_commits = set(
+        subprocess.check_output(
+            ["git", "rev-list", "HEAD"],
+            cwd=repo_dir,
+            env=subprocess_env(),
+            encoding="utf-8",
+        ).split()
+    )
+
+    # Ignore tags that are not ancestors of HEAD
+    for tag, (_, commit) in list(candidates.items()):
+        if commit not in ancestor_commits:
+            _LOGGER.debug("Tag `%s` is not an ancestor of HEAD", tag)
+            del candidates[tag]
+
+    return candidates
+
+
+def _frontier_distances(repo_dir: Path, commits: set[str]) -> dict[str, int]:
+    """
+    Return the distance from HEAD to each independent commit.
+
+    Commits that are ancestors of any other of `commits` are omitted.
+    """
+    if not commits:
+        return {}
+
+    # If commit A is an ancestor of commit B, every commit in B..HEAD is also
+    # in A..HEAD (as is B), so A is strictly farther from HEAD. Only the
+    # independent commits can be closest, so only count the distance to those.
+    env = subprocess_env()
+    frontier_commits = subprocess.check_output(
+        ["git", "merge-base", "--independent", *commits],
+        cwd=repo_dir,
+        env=env,
+        encoding="utf-8",
+    ).split()
+
+    return {
+        commit: int(
             subprocess.check_output(
-                ["git", "rev-list", "--count", f"{tag}..HEAD"],
+                ["git", "rev-list", "--count", f"{commit}..HEAD"],
                 cwd=repo_dir,
+                env=env,
             )
         )
-        version_distances[distance].append(version)
-        logging.getLogger(__name__).debug(
-            "Tag `%s` (version %s) is %d commits away from HEAD", tag, version, distance
+        for commit in frontier_commits
+    }
+
+
+def get_closest_semver_ancestor(
+    repo_dir: Path,
+    allow_prerelease: bool = False,
+    tag_to_commit_map: Optional[dict[str, str]] = None,
+) -> semver.version.Version:
+    """
+    Returns the most recent semantic version ancestor of HEAD.
+
+    If `prerelease` is False, ignore prereleases. `tag_to_commit_map` may be
+    the result of a prior `dereference_tags` call, to avoid repeating it.
+    """
+    # Previously this was using `git describe --tags --abbrev=0 --match
+    # <glob>`, but the differences between the glob and the full regex were
+    # causing issues. Do an exhaustive search instead. Rather than asking git
+    # about each tag individually, resolve every tag at once, filter them in
+    # Python, and test ancestry against a single listing of HEAD's history.
+    if tag_to_commit_map is None:
+        tag_to_commit_map = dereference_tags(repo_dir)
+
+    candidates = _ancestor_candidates(repo_dir, tag_to_commit_map, allow_prerelease)
+    commit_distances = _frontier_distances(
+        repo_dir, {commit for _, commit in candidates.values()}
+    )
+
+    # Track the smallest distance and every version found at that distance
+    min_distance = None
+    closest_versions = []
+
+    for tag, (version, commit) in candidates.items():
+        if commit not in commit_distances:
+            _LOGGER.debug("Tag `%s` is behind a closer tag", tag)
+            continue
+
+        distance = commit_distances[commit]
+        _LOGGER.debug(
+            "Tag `%s` (version %s) is %d commits away from HEAD",
+            tag,
+            version,
+            distance,
         )
 
-    if not version_distances:
+        if min_distance is None or distance < min_distance:
+            min_distance = distance
+            closest_versions = [version]
+        elif distance == min_distance:
+            closest_versions.append(version)
+
+    if min_distance is None:
         fallback = semver.Version(0, 0, 0)
-        logging.getLogger(__name__).log(
+        _LOGGER.log(
             NOTICE,
             "No direct ancestors of HEAD are semantic versions - defaulting to %s",
             fallback,
         )
         return fallback
 
-    min_distance = min(version_distances)
-    closest_versions = sorted(version_distances[min_distance])
-
     if len(closest_versions) > 1:
-        logging.getLogger(__name__).warning(
-            "Multiple tags are equidistant from HEAD: %s", closest_versions
-        )
+        closest_versions.sort()
+        _LOGGER.warning("Multiple tags are equidistant from HEAD: %s", closest_versions)
 
-    logging.getLogger(__name__).info(
-        "Closest ancestor %s is %d commits back", closest_versions[-1], min_distance
+    closest_version = closest_versions[-1]
+
+    _LOGGER.info(
+        "Closest ancestor %s is %d commits back", closest_version, min_distance
     )
 
-    return closest_versions[-1]
+    return closest_version
 
 
 def str_to_bool(value: str) -> bool:
     """Convert a string to a boolean (case-insensitive)."""
-    truthy_values = {"true", "t", "yes", "y", "1"}
-    falsey_values = {"false", "f", "no", "n", "0"}
-
     # Normalize input to lowercase
     value = value.lower()
 
-    if value in truthy_values:
+    if value in _TRUTHY_VALUES:
         return True
 
-    if value in falsey_values:
+    if value in _FALSEY_VALUES:
         return False
 
     raise argparse.ArgumentTypeError(f"Invalid boolean value: '{value}'")
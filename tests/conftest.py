@@ -1,9 +1,12 @@
-"""Local plugin to parametrize tests from a JSON file."""
+"""Local plugin to parametrize tests from a JSON file and create git repos."""
 
 import json
 import datetime
+import functools
+import subprocess
 
 from collections import namedtuple
+from collections.abc import Callable
 from pathlib import Path
 
 import pytest
@@ -13,48 +16,75 @@ ChangelogUpdate = namedtuple(
     "ChangelogUpdate", ("original", "version", "expected", "url", "date")
 )
 
-# Named stash keys for storing the ChangelogUpdate objects between hook calls
-changelog_updates_key = pytest.StashKey[list[ChangelogUpdate]]()
+# Named stash keys for storing the ChangelogUpdate loader between hook calls
+changelog_updates_key = pytest.StashKey[Callable[[], list[ChangelogUpdate]]]()
 
 
-def pytest_configure(config: pytest.Config) -> None:
-    """Configure plugin by loading the Changelog data."""
+def load_changelog_updates() -> list[ChangelogUpdate]:
+    """Load the Changelog data."""
     resource_path = Path(__file__).resolve().parent.joinpath("resources")
     changelogs_file = resource_path / "changelogs.json"
-    with changelogs_file.open(mode="r", encoding="utf-8") as infile:
-        changelog_groups = json.load(infile)
+    changelog_groups = json.loads(changelogs_file.read_bytes())
 
     updates = []
     for group in changelog_groups:
+        original = resource_path / group["original"]
+        url = group["url"]
         date = datetime.date.fromisoformat(group["date"])
 
         updates.append(
             ChangelogUpdate(
-                resource_path / group["original"],
-                None,
-                resource_path / group["formatted"],
-                group["url"],
-                date,
+                original, None, resource_path / group["formatted"], url, date
             )
         )
 
         for version, expected in group.get("bumps", {}).items():
             updates.append(
-                ChangelogUpdate(
-                    resource_path / group["original"],
-                    version,
-                    resource_path / expected,
-                    group["url"],
-                    date,
-                )
+                ChangelogUpdate(original, version, resource_path / expected, url, date)
             )
 
-    config.stash[changelog_updates_key] = updates
+    return updates
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Configure plugin with a loader for the Changelog data."""
+    # Only load the data if a collected test actually needs it
+    config.stash[changelog_updates_key] = functools.cache(load_changelog_updates)
 
 
 def pytest_generate_tests(metafunc: pytest.Metafunc):
     """Inject parameters for the 'changelog_update' fixture."""
     if "changelog_update" in metafunc.fixturenames:
         metafunc.parametrize(
-            "changelog_update", metafunc.config.stash[changelog_updates_key]
+            "changelog_update", metafunc.config.stash[changelog_updates_key]()
         )
+
+
+class GitRepo:
+    """A temporary git repository for tests."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.git("init", "--quiet")
+        self.git("config", "user.name", "Test User")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "commit.gpgsign", "false")
+        self.git("config", "tag.gpgsign", "false")
+        self.git("config", "advice.nestedTag", "false")
+
+    def git(self, *args: str) -> str:
+        """Run a git command in this repository and return the output."""
+        return subprocess.check_output(
+            ["git", *args], cwd=self.path, encoding="utf-8"
+        ).strip()
+
+    def commit(self, message: str = "commit") -> str:
+        """Create an empty commit and return the hash."""
+        self.git("commit", "--quiet", "--allow-empty", "--message", message)
+        return self.git("rev-parse", "HEAD")
+
+
+@pytest.fixture(name="git_repo")
+def fixture_git_repo(tmp_path) -> GitRepo:
+    """Fixture to provide an empty git repository."""
+    return GitRepo(tmp_path)
@@ -7,6 +7,7 @@ import pytest
 import semver
 
 from bumpchanges.alias import ReleaseAliaser, IneligibleAliasError, AliasError, Release
+from bumpchanges.utils import dereference_tags
 
 
 # Sample test case to mock _dereference_tags
@@ -129,3 +130,71 @@ def test_sanity_checks(aliaser, missing_tag, expectation):
 
     with expectation:
         assert aliaser.compute_alias_action(2) == ("v2", "v2.1.0")
+
+
+@pytest.mark.parametrize(
+    "alias_commit,expected_calls",
+    [
+        # The alias already points to the right commit
+        ("baz", 0),
+        # The alias points to an older release
+        ("bar", 2),
+        # The alias points to an untagged commit
+        ("untagged", 2),
+        # The alias doesn't exist
+        (None, 2),
+    ],
+)
+def test_update_alias(aliaser, alias_commit, expected_calls):
+    """Test that the alias is only updated when necessary."""
+    # pylint: disable=protected-access
+    if alias_commit is not None:
+        aliaser._add_git_tag("v2", alias_commit)
+
+    with patch("bumpchanges.alias.subprocess.run") as mock_run:
+        aliaser.update_alias("v2", "v2.1.0")
+
+    assert mock_run.call_count == expected_calls
+
+
+def test_moved_tags(aliaser):
+    """Test that re-registering a tag at a new commit moves it."""
+    # pylint: disable=protected-access
+    aliaser._add_git_tag("v2", "bar")
+
+    # Briefly move v2.1.0 onto the aliased commit, then back again
+    aliaser._add_git_tag("v2.1.0", "bar")
+    aliaser._add_git_tag("v2.1.0", "baz")
+
+    assert aliaser.commit_to_tags_map["bar"] == ["2.0.0", "v2.0.0", "v2"]
+    assert aliaser.commit_to_tags_map["baz"] == ["v2.1.0"]
+    assert aliaser.major_to_tags_map[2] == ["v2.0.0", "v2.1.0"]
+
+    # The alias is not up-to-date, so it must be pushed
+    with patch("bumpchanges.alias.subprocess.run") as mock_run:
+        aliaser.update_alias("v2", "v2.1.0")
+
+    assert mock_run.call_count == 2
+
+
+def test_dereference_tags(git_repo):
+    """Test that annotated tags are dereferenced to their commits."""
+    assert not dereference_tags(git_repo.path)
+
+    first_commit = git_repo.commit()
+    git_repo.git("tag", "v1.0.0")
+    git_repo.git("tag", "--annotate", "--message", "annotated", "v1.0.1")
+    git_repo.git("branch", "v1.0.2")
+
+    second_commit = git_repo.commit()
+    git_repo.git("tag", "--annotate", "--message", "annotated", "v2.0.0")
+    git_repo.git("tag", "--annotate", "--message", "nested", "v2", "v2.0.0")
+    git_repo.git("tag", "nonsemver")
+
+    assert dereference_tags(git_repo.path) == {
+        "v1.0.0": first_commit,
+        "v1.0.1": first_commit,
+        "v2.0.0": second_commit,
+        "v2": second_commit,
+        "nonsemver": second_commit,
+    }
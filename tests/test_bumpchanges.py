@@ -9,17 +9,16 @@ import pytest
 from semver import Version
 
 from bumpchanges.getversion import get_next_semver, get_exact_version
+from bumpchanges.utils import get_closest_semver_ancestor
 
 
 @contextlib.contextmanager
-def mock_tag_exists(tags):
-    """Context manager to mock `tag_exists`."""
-
-    def mock_function(_, tag):
-        """Local mock function."""
-        return tag in tags
-
-    with patch("bumpchanges.getversion.tag_exists", side_effect=mock_function):
+def mock_existing_tags(tags):
+    """Context manager to mock the existing git tags."""
+    with patch(
+        "bumpchanges.getversion.dereference_tags",
+        return_value={tag: "0" * 40 for tag in tags},
+    ):
         yield
 
 
@@ -38,7 +37,7 @@ def test_next_version(last, bump_type, prerelease, expected_str):
     """Get that the next versions match what is expected."""
     with patch("bumpchanges.getversion.get_closest_semver_ancestor", return_value=last):
         # Ignore any tags in _this_ repository while testing
-        with mock_tag_exists([]):
+        with mock_existing_tags([]):
             assert get_next_semver(Path(), bump_type, prerelease) == expected_str
 
 
@@ -64,11 +63,11 @@ def test_fail_on_existing_tags(last, bad_type, existing_tags):
 
     with patch("bumpchanges.getversion.get_closest_semver_ancestor", return_value=last):
         for bump_type in bump_types:
-            with mock_tag_exists([]):
+            with mock_existing_tags([]):
                 # With no tags, everything is valid
                 get_next_semver(Path(), bump_type, False)
 
-            with mock_tag_exists(existing_tags):
+            with mock_existing_tags(existing_tags):
                 with contexts[bump_type]:
                     get_next_semver(Path(), bump_type, False)
 
@@ -90,7 +89,7 @@ def test_fail_on_existing_tags(last, bad_type, existing_tags):
 def test_bumping_prerelease(last, bump_type, existing_tags, expected):
     """Test that multiple generations of prerelease can work."""
     with patch("bumpchanges.getversion.get_closest_semver_ancestor", return_value=last):
-        with mock_tag_exists(existing_tags):
+        with mock_existing_tags(existing_tags):
             assert get_next_semver(Path(), bump_type, True) == expected
 
 
@@ -107,7 +106,7 @@ def test_bumping_prerelease(last, bump_type, existing_tags, expected):
 )
 def test_get_exact(exact_version_str, expectation):
     """Test protections when giving an exact version string."""
-    with mock_tag_exists([]):
+    with mock_existing_tags([]):
         with expectation:
             assert get_exact_version(Path(), exact_version_str) == exact_version_str
 
@@ -125,11 +124,62 @@ def test_exact_tag_protection(exact_version_str, tag):
     """Test that get_exact_version will fail if the version tag already exists."""
     other_tags = ["v1.0.0", "1.0.0", "random"]
 
-    with mock_tag_exists(other_tags):
+    with mock_existing_tags(other_tags):
         assert get_exact_version(Path(), exact_version_str) == exact_version_str
 
     other_tags.append(tag)
 
-    with mock_tag_exists(other_tags):
+    with mock_existing_tags(other_tags):
         with pytest.raises(RuntimeError):
             get_exact_version(Path(), exact_version_str)
+
+
+def test_closest_semver_ancestor(git_repo):
+    """Test finding the closest semantic version ancestor in a real repo."""
+    assert get_closest_semver_ancestor(git_repo.path) == Version(0, 0, 0)
+
+    git_repo.commit()
+    git_repo.git("tag", "--annotate", "--message", "annotated", "v1.0.0")
+
+    git_repo.commit()
+    git_repo.git("tag", "v1.1.0-rc.1")
+
+    # Tags on other branches are not ancestors
+    git_repo.git("checkout", "--quiet", "-b", "side")
+    git_repo.commit("side commit")
+    git_repo.git("tag", "v9.0.0")
+    git_repo.git("checkout", "--quiet", "-")
+
+    git_repo.commit("main commit")
+    git_repo.git("tag", "nonsemver")
+
+    assert get_closest_semver_ancestor(git_repo.path) == Version(1, 0, 0)
+    assert get_closest_semver_ancestor(
+        git_repo.path, allow_prerelease=True
+    ) == Version.parse("1.1.0-rc.1")
+
+
+def test_closest_semver_ancestor_merges(git_repo):
+    """Test that merged tags are measured by their distance from HEAD."""
+    git_repo.commit("base")
+    git_repo.git("tag", "v1.0.0")
+
+    # v1.1.0 is one commit off of the base, v2.0.0 is two commits off
+    git_repo.git("checkout", "--quiet", "-b", "minor")
+    git_repo.commit("minor")
+    git_repo.git("tag", "v1.1.0")
+
+    git_repo.git("checkout", "--quiet", "-b", "major", "v1.0.0")
+    git_repo.commit("major 1")
+    git_repo.commit("major 2")
+    git_repo.git("tag", "v2.0.0")
+
+    git_repo.git("merge", "--quiet", "--no-edit", "minor")
+
+    # v2.0.0..HEAD is {merge, minor}, v1.1.0..HEAD is {merge, major 1, major 2}
+    assert get_closest_semver_ancestor(git_repo.path) == Version(2, 0, 0)
+
+    git_repo.commit("after")
+    git_repo.git("tag", "v2.0.1")
+
+    assert get_closest_semver_ancestor(git_repo.path) == Version(2, 0, 1)
@@ -1,9 +1,13 @@
 """Tests for CHANGELOG parsing and reformatting."""
 
+import io
+import subprocess
+
 from contextlib import nullcontext
 from unittest.mock import patch
 
 import pytest
+from semver import Version
 
 from bumpchanges.utils import (
     encode_branch_name,
@@ -11,6 +15,10 @@ from bumpchanges.utils import (
     Release,
     NoAppropriateTagError,
     get_nearest_ancestor_release_tag,
+    get_github_releases_from_repo_name,
+    subprocess_env,
+    tag_to_semver,
+    version_to_tag_str,
 )
 
 
@@ -32,6 +40,32 @@ def test_encoding_and_decoding(version_str):
     assert version_str == decode_branch_name(branch_name)
 
 
+@pytest.mark.parametrize(
+    "tag,result",
+    [
+        ("v1.2.3", nullcontext("1.2.3")),
+        ("v1.2.3-rc.1+build.5", nullcontext("1.2.3-rc.1+build.5")),
+        ("1.2.3", pytest.raises(ValueError)),
+        ("v1.2", pytest.raises(ValueError)),
+        ("v1.alpha", pytest.raises(ValueError)),
+        ("v-legacy", pytest.raises(ValueError)),
+        ("vendor/foo", pytest.raises(ValueError)),
+        ("v01.2.3", pytest.raises(ValueError)),
+    ],
+)
+def test_tag_to_semver(tag, result):
+    """Test that only semantic version tags are parsed."""
+    with result as res:
+        assert str(tag_to_semver(tag)) == res
+
+
+def test_version_to_tag_str_build_metadata():
+    """Test that versions differing only in build metadata keep distinct tags."""
+    # semver ignores build metadata for equality and hashing
+    assert version_to_tag_str(Version.parse("1.0.0+build.1")) == "v1.0.0+build.1"
+    assert version_to_tag_str(Version.parse("1.0.0+build.2")) == "v1.0.0+build.2"
+
+
 RELEASES = [
     Release("", "v1.0.0", False, False),
     Release("", "v1.0.1", False, False),
@@ -63,3 +97,41 @@ def test_prior_release_tag(tag, releases, result):
     ):
         with result as res:
             assert get_nearest_ancestor_release_tag("", tag) == res
+
+
+def test_subprocess_env(monkeypatch):
+    """Test that subprocesses see the current environment."""
+    monkeypatch.setenv("GH_TOKEN", "refreshed")
+    monkeypatch.setenv("LC_ALL", "en_US.UTF-8")
+
+    env = subprocess_env()
+    assert env["GH_TOKEN"] == "refreshed"
+    assert env["LC_ALL"] == "C"
+
+
+@pytest.mark.parametrize(
+    "returncode,expectation",
+    [(0, nullcontext()), (1, pytest.raises(subprocess.CalledProcessError))],
+)
+def test_parse_github_releases(returncode, expectation):
+    """Test that the reshaped GitHub API output is parsed into Releases."""
+    releases_output = "\n".join((
+        '{"name":"Release 1.0.0","tagName":"v1.0.0","isDraft":false,"isPrerelease":false}',
+        '{"name":"","tagName":"v2.0.0-rc.1","isDraft":true,"isPrerelease":true}',
+    ))
+
+    with patch("bumpchanges.utils.subprocess.Popen") as mock_popen:
+        proc = mock_popen.return_value.__enter__.return_value
+        proc.stdout = io.BytesIO(releases_output.encode("utf-8"))
+        proc.returncode = returncode
+
+        with expectation:
+            assert get_github_releases_from_repo_name("foo/bar") == [
+                Release("Release 1.0.0", "v1.0.0", False, False),
+                Release("", "v2.0.0-rc.1", True, True),
+            ]
+
+    # The repository name is split into the GraphQL query variables
+    args = mock_popen.call_args.args[0]
+    assert args[:3] == ["gh", "api", "graphql"]
+    assert args[-4:] == ["-f", "owner=foo", "-f", "repo=bar"]
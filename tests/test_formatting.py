@@ -1,6 +1,8 @@
 """Tests for CHANGELOG parsing and reformatting."""
 
-from bumpchanges.changelog import Changelog
+from markdown_it.token import Token
+
+from bumpchanges.changelog import Changelog, ChangelogVersion
 
 
 def test_formatting(changelog_update):
@@ -15,3 +17,25 @@ def test_formatting(changelog_update):
     expected_text = changelog_update.expected.read_text(encoding="utf-8")
 
     assert expected_text == result_text
+
+
+def test_serialized_tokens_are_independent():
+    """Confirm that editing serialized tokens doesn't affect later output."""
+    version = ChangelogVersion(
+        version_str="1.0.0", added=[Token("text", tag="", nesting=0)]
+    )
+
+    # The section items belong to the version, but the structural heading and
+    # list tokens must be created for each serialization
+    structural = (
+        "heading_open",
+        "heading_close",
+        "bullet_list_open",
+        "bullet_list_close",
+    )
+
+    for token in version.serialize():
+        if token.type in structural:
+            token.tag = "edited"
+
+    assert not any(token.tag == "edited" for token in version.serialize())
@@ -84,6 +84,16 @@ version_strings = [
         """version 90304""",
         """version 2.3.4""",
     ),
+    (
+        # Value on the line after the key
+        """version:\n  1.0""",
+        """version:\n  2.3.4""",
+    ),
+    (
+        # Quoted value on the line after the key
+        """name: x\nversion:\n  '1.0.0'""",
+        """name: x\nversion:\n  '2.3.4'""",
+    ),
 ]
 
 
@@ -97,3 +107,25 @@ def test_version_updates(tmp_path, original, expected):
     version_file.write_text(original, encoding="utf-8")
     update_file(version, version_file)
     assert version_file.read_text(encoding="utf-8") == expected
+
+
+def test_version_update_in_context(tmp_path):
+    """Confirm that only the version line of a larger file is updated."""
+    version_file = tmp_path / "version.py"
+    version_file.write_text(
+        '"""Module docstring."""\n\n__version__ = "1.1.0"\nOTHER = "1.1.0"\n',
+        encoding="utf-8",
+    )
+    update_file("2.3.4", version_file)
+    assert version_file.read_text(encoding="utf-8") == (
+        '"""Module docstring."""\n\n__version__ = "2.3.4"\nOTHER = "1.1.0"\n'
+    )
+
+    # Multiple matching lines are an error
+    version_file.write_text('version = "1.1.0"\nVERSION = "1.1.0"\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        update_file("2.3.4", version_file)
+
+    # ... even if the version is unchanged
+    with pytest.raises(ValueError):
+        update_file("1.1.0", version_file)